@@ -1,10 +1,27 @@
 import asyncio
+import re
 from mastodon import Mastodon
 
 # Anpassbare Variablen
 api_base_url = 'https://EXEMPEL.social'  # Die Basis-URL Ihrer Mastodon-Instanz
 access_token = 'YOUR_TOKEN'  # Ihr Access-Token
 
+# Folgen von mehreren '#' (z.B. aus '@#' oder '##' entstanden)
+HASH_RUN_PATTERN = re.compile(r'#{2,}')
+
+# Der Mastodon-Client wird einmal erstellt und wiederverwendet, damit die HTTP-Verbindung erhalten bleibt
+mastodon_client = None
+
+
+def get_mastodon_client():
+    global mastodon_client
+    if mastodon_client is None:
+        mastodon_client = Mastodon(
+            access_token=access_token,
+            api_base_url=api_base_url
+        )
+    return mastodon_client
+
 
 def post_tweet(mastodon, message):
     # Veröffentliche den Tweet auf Mastodon
@@ -15,8 +32,8 @@ def post_tweet(mastodon, message):
 def truncate_text(text):
     # Ersetze alle '@' Zeichen durch '#'
     text = text.replace('@', '#')
-    # Entferne doppelte '#'
-    text = text.replace('##', '#')
+    # Entferne mehrfache '#' in einem Durchlauf
+    text = HASH_RUN_PATTERN.sub('#', text)
     text = text.replace('https://twitter.com', '#shitter ')
     # Prüfe, ob der Text länger als 500 Zeichen ist
     if len(text) > 500:
@@ -25,25 +42,24 @@ def truncate_text(text):
         return text
 
 
-    
+# Satzzeichen, die aus Hashtags entfernt werden (ein Durchlauf statt vier replace-Aufrufe)
+HASHTAG_PUNCTUATION = str.maketrans('', '', '.,:;')
+
 def extract_hashtags(content, username):
     # Entferne "@"-Symbol aus dem Benutzernamen, falls vorhanden
     if username.startswith("@"):
         username = username[1:]
     
-    # Suche nach Hashtags im Inhalt
-    hashtags = ""
+    # Suche nach Hashtags im Inhalt (gesammelt und am Ende einmal zusammengefügt)
+    hashtags = []
     words = content.split()
     for word in words:
         if word.startswith("#") and len(word) > 1:
-            word = word.replace('.', '')
-            word = word.replace(',', '')
-            word = word.replace(':', '')
-            word = word.replace(';', '')
+            word = word.translate(HASHTAG_PUNCTUATION)
             hashtag_with_username = f"{word}_{username}"
-            hashtags += " " + hashtag_with_username
+            hashtags.append(" " + hashtag_with_username)
             
-    return hashtags
+    return "".join(hashtags)
 
 def post_tweet_with_images(mastodon, message, images):
     # Veröffentliche den Beitrag mit einem oder mehreren Bildern auf Mastodon
@@ -61,34 +77,26 @@ def post_tweet_with_images(mastodon, message, images):
 
 
 def main(new_tweets):
-    mastodon = Mastodon(
-        access_token=access_token,
-        api_base_url=api_base_url
-    )
+    mastodon = get_mastodon_client()
     
-    for n, tweet in enumerate(new_tweets, start=1):
-        user = tweet['user']
+    for tweet in new_tweets:
+        # Nur die Felder auslesen, die für die Nachricht gebraucht werden
         username = tweet['username']
         content = tweet['content']
         posted_time = tweet['posted_time']
-        var_href = tweet['var_href']
-        var_href = var_href.replace('https://twitter.com', '#shitter ')
-
-        images = tweet['images']
-        extern_urls = tweet['extern_urls']
+        var_href = tweet['var_href'].replace('https://twitter.com', '#shitter ')
         images_as_string = tweet['images_as_string']
         extern_urls_as_string = tweet['extern_urls_as_string']
         
-        hashtags = extract_hashtags(content, username)
         message = f"#{username}:\n\n{content}\n\n#öpnv_berlin_bot\n\nsrc: {var_href}\n{extern_urls_as_string}\n{posted_time}\n{images_as_string}"
 
-        post_tweet(mastodon, message, username)
+        post_tweet(mastodon, message)
         
-        #if not images:
+        #if not tweet['images']:
             #print("")
             #post_tweet(mastodon, message)
         #else:
-            #post_tweet_with_images(mastodon, message, images)
+            #post_tweet_with_images(mastodon, message, tweet['images'])
 
 # Hauptprogramm (z.B. wo der Twitter-Bot aufgerufen wird)
 if __name__ == "__main__":
@@ -1,21 +1,48 @@
 import asyncio
 import os
+import time
+import functools
 import telegram
 from telegram.ext import Updater
+from telegram.request import HTTPXRequest
 import json
+import re
+import logging
 
 # Telegram-Bot-Parameter
 bot_token = "API:TOKEN"
 
+# Maximale Anzahl gleichzeitig verschickter Nachrichten; zwischen zwei Blöcken liegt mindestens eine Sekunde,
+# damit der Bot unter der Grenze von Telegram (ca. 30 Nachrichten pro Sekunde) bleibt
+SEND_BATCH_SIZE = 20
+
+# Der Bot wird einmal erstellt und wiederverwendet, damit die HTTP-Verbindungen erhalten bleiben
+telegram_client = None
+
+def get_telegram_bot():
+    global telegram_client
+    if telegram_client is None:
+        # Standardmäßig hat der Bot nur eine Verbindung im Pool; für gleichzeitige Nachrichten eine pro Nachricht eines Blocks
+        telegram_client = telegram.Bot(token=bot_token, request=HTTPXRequest(connection_pool_size=SEND_BATCH_SIZE))
+    return telegram_client
+
 #Die Datei erstezt die alte my_filter Liste
 DATA_FILE = 'data.json'
 
+# Zwischenspeicher der eingelesenen Filterregeln, wird nur bei Änderung der Datei neu geladen
+data_cache = {"version": None, "data": []}
+
 def load_data():
-    if os.path.exists(DATA_FILE):
+    try:
+        stat = os.stat(DATA_FILE)
+    except FileNotFoundError:
+        return []
+    version = (stat.st_mtime_ns, stat.st_size)
+    if data_cache["version"] != version:
         with open(DATA_FILE, 'r') as file:
-            return read_json_to_dict(file)
-    else:
-        return {"chat_id": {}, "keywords": {}}
+            data_cache["data"] = read_json_to_dict(file)
+        data_cache["version"] = version
+    return data_cache["data"]
 
 def read_json_to_dict(json_file):
     data_dict = []
@@ -28,11 +55,19 @@ def read_json_to_dict(json_file):
     for chat_id, keywords in filter_rules.items():
         # Überprüfen, ob die chat_id in chat_ids vorhanden ist
         if chat_id in chat_ids:
-            entry = {"chat_id": int(chat_id), "keywords": keywords}
+            entry = {"chat_id": int(chat_id), "keywords": keywords, "keyword_pattern": compile_keywords(tuple(keywords))}
             data_dict.append(entry)
 
     return data_dict
 
+@functools.lru_cache(maxsize=256)
+def compile_keywords(keywords):
+    # Alle Stichworte eines Chats in einem regulären Ausdruck zusammenfassen, damit der Tweet nur einmal durchsucht wird
+    # Zwischengespeichert pro Stichwort-Tupel: unveränderte Regeln werden nach dem Neuladen nicht neu kompiliert
+    if not keywords:
+        return None
+    return re.compile("|".join(map(re.escape, keywords)))
+
 
 async def send_telegram_message(bot, chat_id, message):
     await bot.send_message(chat_id=chat_id, text=message)
@@ -45,38 +80,53 @@ async def send_telegram_picture (bot, chat_id, images):
 
 async def main(new_tweets):
     # Initialisiere den Telegram-Bot
-    bot = telegram.Bot(token=bot_token)
+    bot = get_telegram_bot()
     my_filter = load_data()
+    # Frühester Beginn des nächsten Blocks, gilt über alle Tweets hinweg
+    next_batch_time = 0
     
     # Ausgabe der Tweet-Texte
-    for n, tweet in enumerate(new_tweets, start=1):
-        user = tweet['user']
+    for tweet in new_tweets:
+        # Nur die Felder auslesen, die für die Nachricht gebraucht werden
         username = tweet['username']
         content = tweet['content']
         posted_time = tweet['posted_time']
         var_href = tweet['var_href']
-        images = tweet['images']
-        extern_urls = tweet['extern_urls']
-        images_as_string = tweet['images_as_string']
         extern_urls_as_string = tweet['extern_urls_as_string']
         message = f"{username} hat einen neuen Tweet veröffentlicht:\n\n{content}\n\nTweet vom: {posted_time}\n\nLink zum Tweet: {var_href}\n\n{extern_urls_as_string}"
         message = message.replace('@', '#')
         
+        recipients = []
+        # Ergebnis pro Suchmuster merken: Chats mit gleichen Stichworten teilen sich ein Muster
+        match_cache = {}
         for entries in my_filter:
             
             chat_id = entries["chat_id"]
-            keywords = entries["keywords"]
+            keyword_pattern = entries["keyword_pattern"]
 
-            if not keywords:
-                await send_telegram_message(bot, chat_id, message)
+            if keyword_pattern is None:
+                recipients.append(chat_id)
             else:
-                keywordincontent = False
-                for keyword in keywords:
-                    if keyword in content:  # Überprüfe, ob das Keyword enthalten ist
-                        keywordincontent = True
+                # Überprüfe, ob eines der Keywords enthalten ist
+                keywordincontent = match_cache.get(keyword_pattern)
+                if keywordincontent is None:
+                    keywordincontent = keyword_pattern.search(content) is not None
+                    match_cache[keyword_pattern] = keywordincontent
                 if keywordincontent:
-                    await send_telegram_message(bot, chat_id, message)
-                    #await send_telegram_picture(bot, chat_id, images)
+                    recipients.append(chat_id)
+                    #await send_telegram_picture(bot, chat_id, tweet['images'])
+
+        # Die Nachrichten an die einzelnen Chats sind unabhängig voneinander und werden gleichzeitig verschickt,
+        # in Blöcken von höchstens SEND_BATCH_SIZE Nachrichten (so viele Verbindungen hat der Pool in get_telegram_bot)
+        for start in range(0, len(recipients), SEND_BATCH_SIZE):
+            batch = recipients[start:start + SEND_BATCH_SIZE]
+            # Restzeit bis zum Ablauf der Sekunde seit dem Ende des vorherigen Blocks abwarten
+            await asyncio.sleep(max(0, next_batch_time - time.monotonic()))
+            results = await asyncio.gather(*(send_telegram_message(bot, chat_id, message) for chat_id in batch), return_exceptions=True)
+            next_batch_time = time.monotonic() + 1
+            for chat_id, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logging.error(f"Error sending tweet to chat {chat_id}: {result}")
         
 
 if __name__ == '__main__':
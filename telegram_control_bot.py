@@ -7,31 +7,51 @@ from telegram.ext import Updater, CommandHandler, MessageHandler
 # Telegram secret access bot token
 BOT_TOKEN = "api:token"
 
+# Wartezeit in Sekunden, die eine Abfrage neuer Nachrichten offen bleibt
+POLL_TIMEOUT = 30
+
 # Dateiname für Chat-IDs und Filterregeln
 DATA_FILE = 'data.json'
 
+# Zwischenspeicher der Daten, wird nur bei Änderung der Datei neu eingelesen
+data_cache = {"version": None, "data": None}
+
+# Funktion zum Ermitteln des Stands der Datei (Änderungszeit und Größe)
+def data_file_version():
+    stat = os.stat(DATA_FILE)
+    return (stat.st_mtime_ns, stat.st_size)
+
 # Funktion zum Laden der Daten aus der Datei
 def load_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r') as file:
-            return json.load(file)
-    else:
+    try:
+        version = data_file_version()
+    except FileNotFoundError:
         return {"chat_ids": {}, "filter_rules": {}}
+    if data_cache["version"] != version:
+        with open(DATA_FILE, 'r') as file:
+            data_cache["data"] = json.load(file)
+        data_cache["version"] = version
+    return data_cache["data"]
 
 # Funktion zum Speichern der Daten in die Datei
 def save_data(data):
-    #Überprüfe, ob die Datei existiert und lese vorhandene Tweets
-    if not os.path.exists(DATA_FILE):
-        # Wenn die Datei nicht existiert, erstelle sie
-        open(DATA_FILE, "a").close()  # Erstelle die Datei, falls sie nicht existiert
-
-    with open(DATA_FILE, 'w') as file:
-        json.dump(data, file)
+    # Zwischenspeicher verwerfen, falls das Schreiben fehlschlägt
+    data_cache["version"] = None
+    # Daten vorab komplett serialisieren und in einem einzigen Schreibvorgang speichern
+    payload = json.dumps(data)
+    tmp_file = DATA_FILE + '.tmp'
+    with open(tmp_file, 'w') as file:
+        file.write(payload)
+    # Atomar ersetzen, damit telegram_bot nie eine halb geschriebene Datei einliest
+    os.replace(tmp_file, DATA_FILE)
+    data_cache["data"] = data
+    data_cache["version"] = data_file_version()
 
 # Funktion zum Laden der Chat-IDs aus den Daten
 def load_chat_ids():
     data = load_data()
-    return data["chat_ids"]
+    # Kopie zurückgeben, damit Änderungen den Zwischenspeicher nicht verfälschen
+    return dict(data["chat_ids"])
 
 # Funktion zum Speichern der Chat-IDs in die Daten
 def save_chat_ids(chat_ids):
@@ -42,45 +62,50 @@ def save_chat_ids(chat_ids):
 # Funktion zum Laden der Filterregeln aus den Daten
 def load_filter_rules(chat_id):
     data = load_data()
-    return data["filter_rules"].get(str(chat_id), [])
+    # Kopie zurückgeben, damit Änderungen den Zwischenspeicher nicht verfälschen
+    return list(data["filter_rules"].get(str(chat_id), []))
 
 # Funktion zum Speichern der Filterregeln in die Daten
 def save_filter_rules(chat_id, filter_rules):
     data = load_data()
+    # Nur schreiben, wenn sich die Regeln tatsächlich geändert haben
+    if data["filter_rules"].get(str(chat_id)) == filter_rules:
+        return
     data["filter_rules"][str(chat_id)] = filter_rules
     save_data(data)
 
 # Funktion zum Hinzufügen von Filterregeln
-async def add_filter_rules(bot, message, chat_id):
-    rules = message.split()[1:]  # Filterregeln aus der Nachricht extrahieren
+async def add_filter_rules(bot, args, chat_id):
+    rules = args  # Filterregeln aus der Nachricht (ohne den Befehl)
     if not rules:
         await add_exempel_command(bot, chat_id)
     else:
         filter_rules = load_filter_rules(chat_id)
-        new_rules = set(filter(lambda x: x.strip(), rules))
-        filter_rules.extend(new_rules)
+        # Neue Regeln in Eingabereihenfolge übernehmen, doppelte (dict.fromkeys) und bereits vorhandene überspringen
+        known_rules = set(filter_rules)
+        filter_rules.extend(rule for rule in dict.fromkeys(rules) if rule not in known_rules)
         save_filter_rules(chat_id, filter_rules)
         await bot.send_message(chat_id=chat_id, text="Filter rules added.")
 
 # Funktion zum Löschen von Filterregeln
-async def delete_filter_rules(bot, message, chat_id):
-    rules = message.split()[1:]  # Filterregeln aus der Nachricht extrahieren
+async def delete_filter_rules(bot, args, chat_id):
+    rules = args  # Filterregeln aus der Nachricht (ohne den Befehl)
     if not rules:
         await del_exempel_command(bot, chat_id)
     else:
         filter_rules = load_filter_rules(chat_id)
-        to_remove = set(filter(lambda x: x.strip(), rules))
+        to_remove = set(rules)
         filter_rules = [rule for rule in filter_rules if rule not in to_remove]
         save_filter_rules(chat_id, filter_rules)
         await bot.send_message(chat_id=chat_id, text="Filter rules deleted.")
 
 # Funktion zum Löschen aller Filterregeln
-async def delete_all_rules(bot, message, chat_id):
+async def delete_all_rules(bot, args, chat_id):
     save_filter_rules(chat_id, [])
     await bot.send_message(chat_id=chat_id, text="All filter rules deleted.")
 
 # Funktion zum Anzeigen aller Filterregeln
-async def show_all_rules(bot,message, chat_id):
+async def show_all_rules(bot, args, chat_id):
     filter_rules = load_filter_rules(chat_id)
     if filter_rules:
         await bot.send_message(chat_id=chat_id, text="Filter rules:\n" + '\n'.join(filter_rules))
@@ -96,40 +121,65 @@ async def start_command(bot, chat_id):
         await bot.send_message(chat_id=chat_id, text="Bot started. Welcome!")
         
         
-# Funktion für den /start-Befehl zum Speichern der Chat-ID
+# Hilfetexte sind unveränderlich und werden einmalig beim Import zusammengesetzt
+ADD_EXAMPLE_TEXT = (
+    "Beispiel für die Funktion zum hinzufügen von Filterstichworten:\n\n"
+    "/addfilterrules [dein Stichwort]\n"
+    "/addfilterrules #S42\n"
+    "/addfilterrules Heerstr\n"
+    "/addfilterrules Alexanderplatz\n"
+    "/addfilterrules #M4_BVG\n"
+    "/addfilterrules #100_BVG\n"
+    "/addfilterrules #U1_BVG\n"
+    "\n"
+    "In dem Beispiel schickt der Bot dir für die Linien U1, 100 (Bus), M4 (Tram) und S42 dir alle Nachichten weiter. Ausserdem für den Alexanderplatz und die Heerstr.\n"
+    "\n"
+    "Hinweis: Es handelt sich um einen Freitext. Solange der Stichwort in den ankommenden Tweets enthalten ist, kriegst du eine Nachricht."
+)
+
+DELETE_EXAMPLE_TEXT = (
+    "Beispiel für die Funktion zum löschen von Filterstichworten:\n\n"
+    "/deletefilterrules [dein Stichwort]\n"
+    "/deletefilterrules #S42\n"
+    "/deletefilterrules Heerstr\n"
+    "/deletefilterrules Alexanderplatz\n"
+    "/deletefilterrules #M4_BVG\n"
+    "/deletefilterrules #100_BVG\n"
+    "/deletefilterrules #U1_BVG\n"
+    "\n"
+    "In dem Beispiel löscht der Bot die Suchbegriffe für die Linien U1, 100 (Bus), M4 (Tram) und S42. Ausserdem für den Alexanderplatz und die Heerstr.\n"
+    "\n"
+    "Das heisst du kriegst für die spezifischen Begriffe keine Nachichten mehr. Achtung achte auf die Schreibweise. \n"
+    "\n"
+    "Im Zweifelsfall nutze /showallrules um deine bisherigen Filterbegriffe aufzurufen. Sollten keine Begriffe festgelegt sein, bekommst du alle Nachichten weitergeleitet."
+)
+
+HELP_TEXT = (
+    "Der Bot leitet alle Tweets von #SbahnBerlin #BVG_Bus #BVG_UBahn #BVG_Tram #VIZ_Berlin an den Nutzer weiter.\n\n"
+    "Außer der Nutzer nutzt die Filterbegriffe-Funktion des Bots. Dann werden nur entsprechende Tweets weitergeleitet.\n\n"
+    "/start - Start the bot\n/stop - Stop the bot\n/addfilterrules [rules] - Add filter rules\n/deletefilterrules [rules] - Delete filter rules\n/deleteallrules - Delete all filter rules\n/showallrules - Show all filter rules\n"
+    "/list - bietet eine ausführliche Anleitung für die Funktionen Filter hinzufügen und löschen."
+)
+
+HELP_EXPERT_TEXT = (
+    "Expertentipps:\n"
+    "\n"
+    "Dem Bot können mehre Stichworte gleichzeitig übergeben werden (getrennt durch Leerzeichen)\n"
+    "\n"
+    "Die Funktionen zum hinzufügen und löschen von Filterregeln unterstützten Kurzformen des Befehls.\n"
+    "\n"
+    "Bspw:\n"
+    "/addrule [deine Stichworte]\n"
+    "/delrule [deine Stichworte]\n"
+)
+
+# Funktion für den /list-Befehl: Beispiel zum Hinzufügen von Filterstichworten
 async def add_exempel_command(bot, chat_id):
-    help_text = "Beispiel für die Funktion zum hinzufügen von Filterstichworten:\n\n"
-    help_text += "/addfilterrules [dein Stichwort]\n"
-    help_text += "/addfilterrules #S42\n"
-    help_text += "/addfilterrules Heerstr\n"
-    help_text += "/addfilterrules Alexanderplatz\n"
-    help_text += "/addfilterrules #M4_BVG\n"
-    help_text += "/addfilterrules #100_BVG\n"
-    help_text += "/addfilterrules #U1_BVG\n"
-    help_text += "\n"
-    help_text += "In dem Beispiel schickt der Bot dir für die Linien U1, 100 (Bus), M4 (Tram) und S42 dir alle Nachichten weiter. Ausserdem für den Alexanderplatz und die Heerstr.\n"
-    help_text += "\n"
-    help_text += "Hinweis: Es handelt sich um einen Freitext. Solange der Stichwort in den ankommenden Tweets enthalten ist, kriegst du eine Nachricht."
-    
-    await bot.send_message(chat_id=chat_id, text=help_text)
+    await bot.send_message(chat_id=chat_id, text=ADD_EXAMPLE_TEXT)
     
 async def del_exempel_command(bot, chat_id):
-    help_text = "Beispiel für die Funktion zum löschen von Filterstichworten:\n\n"
-    help_text += "/deletefilterrules [dein Stichwort]\n"
-    help_text += "/deletefilterrules #S42\n"
-    help_text += "/deletefilterrules Heerstr\n"
-    help_text += "/deletefilterrules Alexanderplatz\n"
-    help_text += "/deletefilterrules #M4_BVG\n"
-    help_text += "/deletefilterrules #100_BVG\n"
-    help_text += "/deletefilterrules #U1_BVG\n"
-    help_text += "\n"
-    help_text += "In dem Beispiel löscht der Bot die Suchbegriffe für die Linien U1, 100 (Bus), M4 (Tram) und S42. Ausserdem für den Alexanderplatz und die Heerstr.\n"
-    help_text += "\n"
-    help_text += "Das heisst du kriegst für die spezifischen Begriffe keine Nachichten mehr. Achtung achte auf die Schreibweise. \n"
-    help_text += "\n"
-    help_text += "Im Zweifelsfall nutze /showallrules um deine bisherigen Filterbegriffe aufzurufen. Sollten keine Begriffe festgelegt sein, bekommst du alle Nachichten weitergeleitet."
-    
-    await bot.send_message(chat_id=chat_id, text=help_text)
+    await bot.send_message(chat_id=chat_id, text=DELETE_EXAMPLE_TEXT)
+
 
 # Funktion für den /stop-Befehl zum Löschen der Chat-ID
 async def stop_command(bot, chat_id):
@@ -142,61 +192,77 @@ async def stop_command(bot, chat_id):
 
 # Funktion für den /hilfe-Befehl zum Anzeigen aller verfügbaren Befehle
 async def help_command(bot, chat_id):
-    help_text = "Der Bot leitet alle Tweets von #SbahnBerlin #BVG_Bus #BVG_UBahn #BVG_Tram #VIZ_Berlin an den Nutzer weiter.\n\n"
-    help_text += "Außer der Nutzer nutzt die Filterbegriffe-Funktion des Bots. Dann werden nur entsprechende Tweets weitergeleitet.\n\n"
-    help_text += "/start - Start the bot\n/stop - Stop the bot\n/addfilterrules [rules] - Add filter rules\n/deletefilterrules [rules] - Delete filter rules\n/deleteallrules - Delete all filter rules\n/showallrules - Show all filter rules\n"
-    help_text += "/list - bietet eine ausführliche Anleitung für die Funktionen Filter hinzufügen und löschen."
-    await bot.send_message(chat_id=chat_id, text=help_text)
-    
-    help_text = "Expertentipps:\n"
-    help_text += "\n"
-    help_text += "Dem Bot können mehre Stichworte gleichzeitig übergeben werden (getrennt durch Leerzeichen)\n"
-    help_text += "\n"
-    help_text += "Die Funktionen zum hinzufügen und löschen von Filterregeln unterstützten Kurzformen des Befehls.\n"
-    help_text += "\n"
-    help_text += "Bspw:\n"
-    help_text += "/addrule [deine Stichworte]\n"
-    help_text += "/delrule [deine Stichworte]\n"
-    await bot.send_message(chat_id=chat_id, text=help_text)
+    await bot.send_message(chat_id=chat_id, text=HELP_TEXT)
+    await bot.send_message(chat_id=chat_id, text=HELP_EXPERT_TEXT)
 
 # Funktion zum Starten des Bots
 async def start_bot():
     bot = telegram.Bot(token=BOT_TOKEN)
     update_id = None
     while True:
-        updates = await bot.get_updates(offset=update_id)
+        # Long Polling: Telegram hält die Anfrage offen, bis neue Nachrichten da sind oder POLL_TIMEOUT abläuft
+        updates = await bot.get_updates(offset=update_id, timeout=POLL_TIMEOUT)
         for update in updates:
-            update_id = update.update_id + 1
             await process_update(bot, update)
+        # Die Updates kommen aufsteigend sortiert, der nächste Offset folgt auf das letzte
+        if updates:
+            update_id = updates[-1].update_id + 1
+
+# Funktion für den /start-Befehl und für Nachrichten ohne Befehl
+async def start_and_help_command(bot, args, chat_id):
+    await start_command(bot, chat_id)
+    await help_command(bot, chat_id)
+
+# Funktion für den /list-Befehl
+async def list_command(bot, args, chat_id):
+    await add_exempel_command(bot, chat_id)
+    await del_exempel_command(bot, chat_id)
+
+# Funktion für den /hilfe-Befehl und für unbekannte Befehle
+async def help_only_command(bot, args, chat_id):
+    await help_command(bot, chat_id)
+
+# Funktion für den /stop-Befehl
+async def stop_only_command(bot, args, chat_id):
+    await stop_command(bot, chat_id)
+
+# Befehle nach ihren Präfixen (erfasst auch Kurzformen wie /addrule und Schreibweisen wie /start@botname),
+# in der Reihenfolge der Prüfung: /deleteallrules muss vor /del stehen
+# Alle Funktionen erhalten (bot, args, chat_id), args sind die Wörter nach dem Befehl
+COMMANDS = (
+    ('/start', start_and_help_command),
+    ('/stop', stop_only_command),
+    ('/hilfe', help_only_command),
+    ('/add', add_filter_rules),
+    ('/deleteallrules', delete_all_rules),
+    ('/del', delete_filter_rules),
+    ('/showallrules', show_all_rules),
+    ('/list', list_command),
+)
+
+# Funktion zum Ermitteln der Funktion für eine Nachricht
+def parse_command(message):
+    for prefix, handler in COMMANDS:
+        if message.startswith(prefix):
+            return handler
+    if message.startswith('/'):
+        # Unbekannter Befehl
+        return help_only_command
+    # Nachricht ohne Befehl
+    return start_and_help_command
 
 # Funktion zum Verarbeiten eines Updates
 async def process_update(bot, update):
     if update.message:
         message = update.message.text
+        # Nachrichten ohne Text (z.B. Fotos oder Sticker) werden ignoriert
+        if not message:
+            return
         chat_id = update.message.chat.id
-        if message.startswith('/start'):
-            await start_command(bot, chat_id)
-            await help_command(bot, chat_id)
-        elif message.startswith('/stop'):
-            await stop_command(bot, chat_id)
-        elif message.startswith('/hilfe'):
-            await help_command(bot, chat_id)
-        elif message.startswith('/add'):
-            await add_filter_rules(bot, message, chat_id)
-        elif message.startswith('/deleteallrules'):
-            await delete_all_rules(bot, message, chat_id)
-        elif message.startswith('/del'):
-            await delete_filter_rules(bot, message, chat_id)
-        elif message.startswith('/showallrules'):
-            await show_all_rules(bot, message, chat_id)
-        elif message.startswith('/list'):
-            await add_exempel_command(bot, chat_id)
-            await del_exempel_command(bot, chat_id)
-        elif message.startswith('/'):
-            await help_command(bot, chat_id)
-        else:
-            await start_command(bot, chat_id)
-            await help_command(bot, chat_id)
+        # Nachricht nur einmal in Wörter zerlegen; die Funktionen erhalten die Argumente nach dem Befehl
+        tokens = message.split()
+        handler = parse_command(message)
+        await handler(bot, tokens[1:], chat_id)
 
 # Ausführen des Bots
 if __name__ == "__main__":
@@ -2,6 +2,8 @@ import telegram_bot
 import mastodon_bot
 import time
 import os
+import re
+import datetime
 import asyncio
 import logging
 from selenium import webdriver
@@ -15,7 +17,17 @@ firefox_profile_path = "C:\\Users\\YOUR_USER\\AppData\\Roaming\\Mozilla\\Firefox
 
 twitter_link = "https://twitter.com/i/lists/1741534129215172901"
 
-#filename = "existing_tweets.txt"
+# Datei mit den Links der bereits weitergeleiteten Tweets
+filename = "existing_tweets.txt"
+
+# Abstand zwischen dem Beginn zweier Durchläufe in Sekunden (hier: 1 Minute)
+CRAWL_INTERVAL = 60
+
+# Gewünschtes Format für Datum und Uhrzeit der Tweets
+POSTED_TIME_FORMAT = "%d.%m.%Y %H:%M"
+
+# Regulärer Ausdruck, um URLs im Tweet-Text zu erkennen (http://, https:// und htt:// in einem Durchlauf)
+URL_PATTERN = re.compile(r"https?://\S+|http?://\S+")
 
 firefox_options = Options()
 firefox_options.headless = True   # Öffnet den Browser sichtbar für den Benutzer
@@ -37,18 +49,52 @@ def delete_temp_files():
             folder_full_path = os.path.join(folder_path, folder_name)
             try:
                 os.rmdir(folder_full_path)
-                print(f"Deleted folder: {folder_full_path}")
+                logging.debug(f"Deleted folder: {folder_full_path}")
             except Exception as e:
-                print(f"Error deleting folder {folder_full_path}: {e}")
+                # Nicht leere oder fremde Ordner schlagen bei jedem Durchlauf fehl, daher nur auf Debug-Ebene
+                logging.debug(f"Error deleting folder {folder_full_path}: {e}")
 
-def find_all_tweets(driver):
-    """Finds all tweets from the page"""
+def parse_tweet_timestamp(timestamp):
+    """Parses the datetime attribute of a tweet (e.g. 2024-03-01T12:34:56.000Z)"""
+    try:
+        return datetime.datetime.fromisoformat(timestamp)
+    except ValueError:
+        # Fallback für abweichende Formate
+        return parse(timestamp)
+
+def load_existing_tweets():
+    """Reads the links of all tweets that were already forwarded"""
+    #Überprüfe, ob die Datei existiert und lese vorhandene Tweets
+    if not os.path.exists(filename):
+        # Wenn die Datei nicht existiert, erstelle sie
+        open(filename, "a").close()  # Erstelle die Datei, falls sie nicht existiert
+
+    # Öffne die Datei im Lese-Modus, um vorhandene Links zu überprüfen
+    with open(filename, "r") as file:
+        # Als Menge für schnelles Nachschlagen
+        return set(file.read().splitlines())
+
+def find_all_tweets(driver, known_tweets=frozenset()):
+    """Finds all tweets from the page, skipping the details of already known tweets"""
     try:
         tweets = driver.find_elements(By.CSS_SELECTOR, '[data-testid="tweet"]')
         time.sleep(15)
         tweets = driver.find_elements(By.CSS_SELECTOR, '[data-testid="tweet"]')
         tweet_data = []
+
+        # Prüfen, ob die Zeitzone Sommerzeit (DST) ist - einmal pro Durchlauf statt pro Tweet
+        is_dst = bool(datetime.datetime.now().astimezone().dst())
+
+        # Lokale Zeitzone festlegen (hier als Beispiel Berlin)
+        local_timezone = datetime.timezone(datetime.timedelta(hours=2 if is_dst else 1))  # MESZ (UTC+2) oder MEZ (UTC+1)
+
         for i, tweet in enumerate(tweets):
+            # Link zuerst auslesen: bereits bekannte Tweets werden ohne weitere Abfragen an den Browser übersprungen
+            anchor = tweet.find_element(By.CSS_SELECTOR, "a[aria-label][dir]")
+            var_href = anchor.get_attribute("href")
+            if var_href in known_tweets:
+                continue
+
             tweet_parts = tweet.text.split("\n")
             
             user = tweet_parts[0]  # Der Benutzername ist der erste Teil des ersten Zeileninhalts
@@ -60,28 +106,16 @@ def find_all_tweets(driver):
             replies_element = tweet.find_element(By.CSS_SELECTOR, '[data-testid="reply"]')
             replies = replies_element.text
             
-            anchor = tweet.find_element(By.CSS_SELECTOR, "a[aria-label][dir]")
-            var_href = anchor.get_attribute("href")
-            
             timestamp = tweet.find_element(By.TAG_NAME, "time").get_attribute("datetime")
             
            # Zeitstempel parsen
-            posted_time_utc = parse(timestamp)
-
-            # Prüfen, ob die Zeitzone Sommerzeit (DST) ist
-            is_dst = bool(datetime.datetime.now().astimezone().dst())
-
-            # Lokale Zeitzone festlegen (hier als Beispiel Berlin)
-            local_timezone = datetime.timezone(datetime.timedelta(hours=2 if is_dst else 1))  # MESZ (UTC+2) oder MEZ (UTC+1)
+            posted_time_utc = parse_tweet_timestamp(timestamp)
 
             # Zeitstempel in lokale Zeitzone konvertieren
             posted_time_local = posted_time_utc.astimezone(local_timezone)
 
-            # Gewünschtes Format für Datum und Uhrzeit definieren
-            desired_format = "%d.%m.%Y %H:%M"
-
             # Zeitstempel im gewünschten Format ausgeben
-            posted_time = posted_time_local.strftime(desired_format)
+            posted_time = posted_time_local.strftime(POSTED_TIME_FORMAT)
                        
             image_element = tweet.find_elements(By.CSS_SELECTOR,'div[data-testid="tweetPhoto"]')
             images = []
@@ -99,12 +133,9 @@ def find_all_tweets(driver):
                 href = href_0.get_attribute("href")
                 extern_urls.append(href)
             
-            # Regulärer Ausdruck, um URLs zu erkennen
-            url_pattern = re.compile(r"https?://\S+")
-            content = url_pattern.sub('', content)
-            
-            url_pattern = re.compile(r"http?://\S+")
-            content = url_pattern.sub('', content)
+            # URLs aus dem Text entfernen (das Muster setzt "://" voraus, ohne das entfällt die Regex-Suche)
+            if "://" in content:
+                content = URL_PATTERN.sub('', content)
             
             if not images:
                 images_as_string = ""
@@ -135,48 +166,24 @@ def find_all_tweets(driver):
         logging.error(f"Error finding tweets: {ex}")
         return []
 
-def check_and_write_tweets(tweet_data):
+def check_and_write_tweets(tweet_data, existing_tweets):
+    """Returns the new tweets and records their links; existing_tweets is the set read at the start of the cycle"""
     try:
-        #Überprüfe, ob die Datei existiert und lese vorhandene Tweets
-        if not os.path.exists(filename):
-            # Wenn die Datei nicht existiert, erstelle sie
-            open(filename, "a").close()  # Erstelle die Datei, falls sie nicht existiert
-
-       # Öffne die Datei im Lese-Modus, um vorhandene Links zu überprüfen
-        with open(filename, "r") as file:
-            existing_tweets = file.read().splitlines()
-
         new_tweets = []
         # Überprüfe jeden Tweet in den Daten
-        for n, tweet in enumerate(tweet_data, start=1):
-            user = tweet['user']
-            username = tweet['username']
-            content = tweet['content']
-            posted_time = tweet['posted_time']
+        for tweet in tweet_data:
             var_href = tweet['var_href']
-            images = tweet['images']
-            extern_urls = tweet['extern_urls']
-            images_as_string = tweet['images_as_string']
-            extern_urls_as_string = tweet['extern_urls_as_string']
-
 
             # Überprüfe, ob der Link bereits in den vorhandenen Tweets enthalten ist
+            # Die Tweet-Daten aus find_all_tweets sind bereits vollständig aufbereitet und werden direkt übernommen
             if var_href not in existing_tweets:
-                new_tweets.append({
-                    "user": user,
-                    "username": username,
-                    "content": content,
-                    "posted_time": posted_time,
-                    "var_href": var_href,
-                    "images": images,
-                    "extern_urls": extern_urls,
-                    "images_as_string": images_as_string,
-                    "extern_urls_as_string": extern_urls_as_string
-                })
-
-                # Wenn nicht, schreibe den Link in die Datei
-                with open(filename, "a") as file:
-                    file.write(var_href + "\n")
+                existing_tweets.add(var_href)
+                new_tweets.append(tweet)
+
+        # Die Links aller neuen Tweets in einem Schreibvorgang an die Datei anhängen
+        if new_tweets:
+            with open(filename, "a") as file:
+                file.write("".join(tweet['var_href'] + "\n" for tweet in new_tweets))
 
         return new_tweets
     except Exception as ex:
@@ -207,22 +214,35 @@ def trim_existing_tweets_file():
 
 async def main():
     while True:
+        # Beginn des Durchlaufs, die Wartezeit wird ab hier gerechnet
+        cycle_start = time.monotonic()
         try:
+            # Bereits weitergeleitete Tweets, deren Details beim Auslesen übersprungen werden
+            known_tweets = load_existing_tweets()
+
             #Falls du ohne einloggen Twitter crawlen willst:
             #driver = webdriver.Firefox(options=firefox_options)
             
             driver = webdriver.Firefox(options=firefox_options, firefox_profile=firefox_profile_path)
             driver.get(twitter_link)
-            tweet_data = find_all_tweets(driver)
-            new_tweets = check_and_write_tweets(tweet_data)
+            tweet_data = find_all_tweets(driver, known_tweets)
+            new_tweets = check_and_write_tweets(tweet_data, known_tweets)
 
             #print(new_tweets)
 
-            # Aufruf der Funktion in telegram_bot.py
-            await telegram_bot.main(new_tweets)
-
-            # Aufruf der Funktion in mastodon_bot.py
-            mastodon_bot.main(new_tweets)
+            # Ohne neue Tweets gibt es nichts weiterzuleiten
+            if new_tweets:
+                # Telegram und Mastodon sind unabhängig voneinander und werden gleichzeitig beliefert
+                results = await asyncio.gather(
+                    # Aufruf der Funktion in telegram_bot.py
+                    telegram_bot.main(new_tweets),
+                    # Aufruf der Funktion in mastodon_bot.py (blockierende HTTP-Aufrufe laufen in einem eigenen Thread)
+                    asyncio.to_thread(mastodon_bot.main, new_tweets),
+                    return_exceptions=True
+                )
+                for result in results:
+                    if isinstance(result, Exception):
+                        logging.error(f"Error delivering tweets: {result}")
 
             # Browser schließen
             driver.quit()
@@ -232,13 +252,13 @@ async def main():
             #Falls du ohne einloggen Twitter crawlen willst, brauchst du die nicht mehr
             delete_temp_files()
 
-            # Wartezeit, bevor die nächste Iteration beginnt
-            await asyncio.sleep(60)   # Wartezeit in Sekunden (hier: 1 Minuten)
+            # Wartezeit, bevor die nächste Iteration beginnt: nur die Restzeit bis zum nächsten Durchlauf
+            await asyncio.sleep(max(0, CRAWL_INTERVAL - (time.monotonic() - cycle_start)))
 
         except Exception as e:
             logging.error(f"An error occurred: {e}")
             # Fehlerbehandlung, z.B. Neustart des Browsers oder Wartezeit vor erneutem Versuch
-            time.sleep(60)  # Wartezeit vor erneutem Versuch in Sekunden (hier: 1 Minute)
+            await asyncio.sleep(60)  # Wartezeit vor erneutem Versuch in Sekunden (hier: 1 Minute)
         
         
 if __name__ == '__main__':